@@ -22,7 +22,10 @@ sys.path.append(os.getcwd())
 
 import yaml
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 from snowpark_connect import func_create_snowpark_session
+from domain_utils import DOMAIN_HOST_PATTERN
 
 def load_sql_queries(yaml_path='sql_queries.yaml'):
     """
@@ -35,6 +38,21 @@ def load_sql_queries(yaml_path='sql_queries.yaml'):
         queries = yaml.safe_load(file)
     return queries
 
+def normalize_domains(column):
+    """
+    Normalize raw URLs to bare hosts in a single pyarrow compute pass
+    (lowercase, trim, drop protocol/www prefix and any path)
+    
+    Args:
+        column: pyarrow array or ChunkedArray of raw URLs/domains
+    
+    Returns:
+        pa.ChunkedArray: Normalized domains (nulls preserved)
+    """
+    cleaned = pc.utf8_trim_whitespace(pc.utf8_lower(column))
+    hosts = pc.extract_regex(cleaned, pattern=DOMAIN_HOST_PATTERN)
+    return pc.struct_field(hosts, 'host')
+
 def create_clean_domain_dataset(session, sql_queries):
     """
     Create a clean dataset of domains with networks, ensuring no Raptive domains
@@ -51,48 +69,36 @@ def create_clean_domain_dataset(session, sql_queries):
     # Execute Raptive query
     print("Fetching Raptive domains...")
     raptive_query = sql_queries['df_raptive_query']['select']
-    raptive_df = session.sql(raptive_query).to_pandas()
+    # Fetch as Arrow so normalization runs on pyarrow compute kernels
+    raptive_tbl = session.sql(raptive_query).to_arrow()
     
-    # Standardize column names - Snowflake returns uppercase
-    raptive_df = raptive_df.rename(columns={'URL': 'domain'})
+    # Clean and normalize Raptive domains - Snowflake returns uppercase column names
+    raptive_df = pa.table({'domain': normalize_domains(raptive_tbl['URL'])}).to_pandas(types_mapper=pd.ArrowDtype)
     raptive_df['network'] = 'Raptive'
-    raptive_df = raptive_df[['domain', 'network']]
-    
-    # Clean and normalize Raptive domains
-    raptive_df['domain'] = raptive_df['domain'].str.lower().str.strip()
     raptive_df = raptive_df.dropna(subset=['domain'])
     raptive_df = raptive_df[raptive_df['domain'] != '']
     
-    # Remove any protocol prefixes and paths from Raptive domains
-    raptive_df['domain'] = raptive_df['domain'].str.replace(r'^https?://', '', regex=True)
-    raptive_df['domain'] = raptive_df['domain'].str.replace(r'^www\.', '', regex=True)
-    raptive_df['domain'] = raptive_df['domain'].str.split('/').str[0]
-    
     print(f"Found {len(raptive_df)} Raptive domains")
     
     # Execute competitor query
     print("Fetching competitor domains...")
     competitor_query = sql_queries['df_competitor_sites_query']['select']
-    competitor_df = session.sql(competitor_query).to_pandas()
+    competitor_tbl = session.sql(competitor_query).to_arrow()
     
     # Clean and normalize competitor domains - Snowflake columns are uppercase
-    competitor_df['DOMAIN'] = competitor_df['DOMAIN'].str.lower().str.strip()
+    domain_idx = competitor_tbl.schema.get_field_index('DOMAIN')
+    competitor_tbl = competitor_tbl.set_column(domain_idx, 'DOMAIN', normalize_domains(competitor_tbl['DOMAIN']))
+    competitor_df = competitor_tbl.to_pandas(types_mapper=pd.ArrowDtype)
     competitor_df = competitor_df.dropna(subset=['DOMAIN'])
     competitor_df = competitor_df[competitor_df['DOMAIN'] != '']
     
-    # Remove any protocol prefixes and paths from competitor domains
-    competitor_df['DOMAIN'] = competitor_df['DOMAIN'].str.replace(r'^https?://', '', regex=True)
-    competitor_df['DOMAIN'] = competitor_df['DOMAIN'].str.replace(r'^www\.', '', regex=True) 
-    competitor_df['DOMAIN'] = competitor_df['DOMAIN'].str.split('/').str[0]
-    
     # Rename to lowercase for consistency
     competitor_df = competitor_df.rename(columns={'DOMAIN': 'domain', 'NETWORK': 'network'})
     
     print(f"Found {len(competitor_df)} total competitor domains")
     
     # Remove Raptive domains from competitor data (deduplication)
-    raptive_domains_set = set(raptive_df['domain'].unique())
-    competitor_df_clean = competitor_df[~competitor_df['domain'].isin(raptive_domains_set)]
+    competitor_df_clean = competitor_df[~competitor_df['domain'].isin(raptive_df['domain'])]
     
     removed_count = len(competitor_df) - len(competitor_df_clean)
     if removed_count > 0:
@@ -103,6 +109,9 @@ def create_clean_domain_dataset(session, sql_queries):
     # Combine datasets
     final_df = pd.concat([raptive_df, competitor_df_clean], ignore_index=True)
     
+    # Dictionary-encode network: a handful of values repeated across every row
+    final_df['network'] = final_df['network'].astype('category')
+    
     # Final cleanup - remove duplicates and sort
     final_df = final_df.drop_duplicates(subset=['domain']).reset_index(drop=True)
     final_df = final_df.sort_values(['network', 'domain']).reset_index(drop=True)
@@ -130,30 +139,25 @@ def create_sample_dataset(clean_df, sample_size=500):
     """
     import os
     
-    sampled_dfs = []
-    
     print("=== CREATING SAMPLE DATASET ===")
     
-    for network in clean_df['network'].unique():
-        network_df = clean_df[clean_df['network'] == network].copy()
-        
+    network_counts = clean_df['network'].value_counts(sort=False)
+    for network, count in network_counts.items():
         if network == 'Aditude':
-            # Take all Aditude domains
-            sample_df = network_df
-            print(f"{network}: Taking all {len(sample_df)} domains")
+            print(f"{network}: Taking all {count} domains")
+        elif count <= sample_size:
+            print(f"{network}: Taking all {count} domains (less than {sample_size})")
         else:
-            # Sample specified number for other networks
-            if len(network_df) <= sample_size:
-                sample_df = network_df
-                print(f"{network}: Taking all {len(sample_df)} domains (less than {sample_size})")
-            else:
-                sample_df = network_df.sample(n=sample_size, random_state=42)
-                print(f"{network}: Sampled {len(sample_df)} domains from {len(network_df)}")
-        
-        sampled_dfs.append(sample_df)
+            print(f"{network}: Sampled {sample_size} domains from {count}")
+    
+    # Take Aditude and networks at or under sample_size whole; sample the
+    # rest straight from their groups (sample() already returns new rows)
+    oversized = network_counts.index[(network_counts > sample_size) & (network_counts.index != 'Aditude')]
+    needs_sample = clean_df['network'].isin(oversized)
+    sampled = clean_df[needs_sample].groupby('network', observed=True).sample(n=sample_size, random_state=42)
     
     # Combine all samples
-    final_sample = pd.concat(sampled_dfs, ignore_index=True)
+    final_sample = pd.concat([clean_df[~needs_sample], sampled], ignore_index=True)
     
     print(f"\n=== SAMPLE SUMMARY ===")
     sample_counts = final_sample['network'].value_counts()
@@ -182,7 +186,6 @@ def main():
         # Create Snowpark session
         print("🔗 Connecting to Snowflake...")
         session = func_create_snowpark_session(USER_NAME="smaity")
-        session.sql("use schema DI_AGGREGATIONS").collect()
         print("✅ Connected to Snowflake")
         
         # Load SQL queries
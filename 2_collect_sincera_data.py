@@ -18,13 +18,21 @@ Usage:
 
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import requests
 import time
 import json
+import orjson
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from collections import deque
+from requests.adapters import HTTPAdapter
+from requests_cache import CachedSession
+from urllib3.util.retry import Retry
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -44,158 +52,330 @@ if not SINCERA_API_KEY:
 API_BASE_URL = 'https://open.sincera.io/api/publishers'
 HEADERS = {'Authorization': f'Bearer {SINCERA_API_KEY}'}
 
+# Fields extracted from a successful API response
+METRIC_FIELDS = (
+    'publisher_id', 'name', 'visit_enabled', 'status', 'primary_supply_type',
+    'pub_description', 'categories', 'slug',
+    # Core quality metrics
+    'avg_ads_to_content_ratio', 'avg_ads_in_view', 'avg_ad_refresh',
+    'avg_page_weight', 'avg_cpu',
+    # Supply chain metrics
+    'total_supply_paths', 'reseller_count', 'total_unique_gpids',
+    'id_absorption_rate', 'owner_domain',
+    # Metadata
+    'updated_at',
+)
+
 # Rate limiting constants
 REQUESTS_PER_MINUTE = 45
 REQUESTS_PER_DAY = 5000
 REQUEST_TIMEOUT = 30
+MAX_RETRIES = 3
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Response cache settings (only 200/404 responses are cached)
+CACHE_PATH = 'pickles/sincera_cache'
+CACHE_EXPIRE_AFTER = timedelta(days=1)
+
+# Incremental progress is appended to an Arrow IPC stream
+PROGRESS_STREAM_PATH = 'pickles/sincera_progress.arrow'
+
+# Fixed Arrow schema for collected results, in main table column order.
+# Counts are FLOAT to match the existing Snowflake table. categories is
+# JSON text here (progress stream, CSV) since its nested shape varies
+# between publishers; the pickle and Snowflake upload keep the raw lists.
+RESULT_SCHEMA = pa.schema([
+    ('domain', pa.string()),
+    ('api_success', pa.bool_()),
+    ('api_error', pa.string()),
+    ('fetched_at', pa.string()),
+    ('network', pa.string()),
+    ('publisher_id', pa.float64()),
+    ('name', pa.string()),
+    ('visit_enabled', pa.bool_()),
+    ('status', pa.string()),
+    ('primary_supply_type', pa.string()),
+    ('pub_description', pa.string()),
+    ('categories', pa.string()),
+    ('slug', pa.string()),
+    ('avg_ads_to_content_ratio', pa.float64()),
+    ('avg_ads_in_view', pa.float64()),
+    ('avg_ad_refresh', pa.float64()),
+    ('avg_page_weight', pa.float64()),
+    ('avg_cpu', pa.float64()),
+    ('total_supply_paths', pa.float64()),
+    ('reseller_count', pa.float64()),
+    ('total_unique_gpids', pa.float64()),
+    ('id_absorption_rate', pa.float64()),
+    ('owner_domain', pa.string()),
+    ('updated_at', pa.string()),
+])
+
+# Concurrent fetch settings (also sizes the HTTP connection pool)
+MAX_WORKERS = 8
+
+class TokenBucket:
+    """Thread-safe limiter honoring the per-minute and per-day API caps."""
+    
+    def __init__(self, rate=REQUESTS_PER_MINUTE, per=60, daily_limit=REQUESTS_PER_DAY):
+        self.rate = rate
+        self.per = per
+        self.daily_limit = daily_limit
+        self._request_times = deque()
+        self._requests_today = 0
+        self._next_day_at = time.monotonic() + self._seconds_until_midnight()
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+    
+    @staticmethod
+    def _seconds_until_midnight():
+        """Wall-clock seconds until the next local midnight."""
+        now = datetime.now()
+        tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        return (tomorrow - now).total_seconds()
+    
+    def _start_new_day(self, now):
+        """Reset counters and schedule the next rollover (monotonic seconds)."""
+        self._requests_today = 0
+        self._request_times.clear()
+        self._next_day_at = now + self._seconds_until_midnight()
+    
+    @property
+    def stopped(self):
+        """True once stop() has been called."""
+        return self._stop.is_set()
+    
+    def stop(self):
+        """Wake all waiting callers and stop handing out slots (e.g. on Ctrl-C)."""
+        self._stop.set()
+    
+    def sleep(self, seconds):
+        """Sleep for the given seconds, returning early once stop() is called."""
+        self._stop.wait(seconds)
+    
+    def pause(self, seconds):
+        """Hold back every caller for the given seconds (e.g. after a 429)."""
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+    
+    def acquire(self):
+        """
+        Sleep as needed to honor API rate limits, then claim a request slot.
+        
+        Returns without claiming a slot once stop() is called; callers should
+        check `stopped` before making the request.
+        """
+        # Waiting threads queue up on the lock so slots are handed out in order
+        with self._lock:
+            if self.stopped:
+                return
+            
+            now = time.monotonic()
+            
+            # Honor any server-requested pause
+            if now < self._resume_at:
+                self.sleep(self._resume_at - now)
+                if self.stopped:
+                    return
+                now = time.monotonic()
+            
+            # Reset daily counter if new day
+            if now >= self._next_day_at:
+                self._start_new_day(now)
+            
+            # Check daily limit
+            if self._requests_today >= self.daily_limit:
+                print(f"Daily limit reached ({self.daily_limit}). Waiting until tomorrow...")
+                self.sleep(max(0, self._next_day_at - now))
+                if self.stopped:
+                    return
+                now = time.monotonic()
+                self._start_new_day(now)
+            
+            # Remove requests older than the window
+            while self._request_times and now - self._request_times[0] >= self.per:
+                self._request_times.popleft()
+            
+            # Check window limit
+            if len(self._request_times) >= self.rate:
+                wait_time = self.per - (now - self._request_times[0])
+                if wait_time > 0:
+                    print(f"⏳ Rate limit: waiting {wait_time:.1f}s...")
+                    self.sleep(wait_time)
+                    if self.stopped:
+                        return
+                now = time.monotonic()
+                while self._request_times and now - self._request_times[0] >= self.per:
+                    self._request_times.popleft()
+            
+            self._request_times.append(now)
+            self._requests_today += 1
 
-# Rate limiting state
-_request_times = deque()
-_requests_today = 0
-_current_day = datetime.now().date()
+# Shared across worker threads
+_rate_limiter = TokenBucket()
 
-def respect_rate_limits():
-    """Sleep as needed to honor API rate limits."""
-    global _requests_today, _current_day
-    
-    now = time.time()
-    today = datetime.now().date()
-    
-    # Reset daily counter if new day
-    if today != _current_day:
-        _current_day = today
-        _requests_today = 0
-        _request_times.clear()
-    
-    # Check daily limit
-    if _requests_today >= REQUESTS_PER_DAY:
-        print(f"Daily limit reached ({REQUESTS_PER_DAY}). Waiting until tomorrow...")
-        tomorrow = datetime.combine(today + timedelta(days=1), datetime.min.time())
-        wait_seconds = (tomorrow - datetime.now()).total_seconds()
-        time.sleep(max(0, wait_seconds))
-        _current_day = datetime.now().date()
-        _requests_today = 0
-        _request_times.clear()
-        now = time.time()
-    
-    # Remove requests older than 1 minute
-    while _request_times and now - _request_times[0] >= 60:
-        _request_times.popleft()
-    
-    # Check minute limit
-    if len(_request_times) >= REQUESTS_PER_MINUTE:
-        wait_time = 60 - (now - _request_times[0])
-        if wait_time > 0:
-            print(f"⏳ Rate limit: waiting {wait_time:.1f}s...")
-            time.sleep(wait_time)
-        now = time.time()
-        while _request_times and now - _request_times[0] >= 60:
-            _request_times.popleft()
-    
-    _request_times.append(time.time())
-    _requests_today += 1
+# Shared HTTP session so connections are reused via keep-alive, and
+# responses are cached on disk so re-runs skip the API. urllib3 only
+# retries connection errors; 429/5xx retries go through the rate limiter
+# in fetch_domain_metrics so every request that reaches the API is counted.
+_retry = Retry(
+    total=MAX_RETRIES,
+    backoff_factor=1,
+    status_forcelist=None,
+    respect_retry_after_header=False
+)
+_session = CachedSession(
+    CACHE_PATH,
+    backend='sqlite',
+    expire_after=CACHE_EXPIRE_AFTER,
+    allowable_codes=[200, 404]
+)
+_session.headers.update(HEADERS)
+# One host, so a single pool holding one kept-alive connection per worker
+_session.mount('https://', HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=MAX_WORKERS,
+    pool_block=True,
+    max_retries=_retry
+))
+
+def _to_float(value):
+    """Map a raw API value to a float, or None if it isn't numeric."""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
 
-def fetch_domain_metrics(domain, max_retries=3):
+def _to_bool(value):
+    """Map a raw API value to True/False/None ('true'/'false' strings included)."""
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ('true', 'false'):
+        return value.strip().lower() == 'true'
+    return None
+
+def _to_str(value):
+    """Stringify non-string scalars so they fit a string column."""
+    return value if value is None or isinstance(value, str) else str(value)
+
+# Per-field coercion to RESULT_SCHEMA types, applied at parse time so
+# off-type values (e.g. "N/A" in a numeric field) never fail the save.
+# categories keeps its raw nested value.
+_METRIC_COERCERS = {
+    field.name: _to_float if pa.types.is_floating(field.type)
+    else _to_bool if pa.types.is_boolean(field.type)
+    else _to_str
+    for field in RESULT_SCHEMA
+    if field.name in METRIC_FIELDS and field.name != 'categories'
+}
+
+def fetch_domain_metrics(domain):
     """
     Fetch comprehensive metrics for a domain from Sincera API
     
+    Connection errors are retried by the session's urllib3 Retry policy.
+    429s and 5xx responses are retried here, each attempt taking a rate
+    limiter slot; a 429 pauses all workers for its Retry-After. Responses
+    cached within CACHE_EXPIRE_AFTER are returned without an API call.
+    
     Args:
         domain: Domain to fetch data for
-        max_retries: Maximum retry attempts
         
     Returns:
         dict: Metrics data or error information
     """
     
-    for attempt in range(max_retries):
-        try:
-            respect_rate_limits()
-            
-            response = requests.get(
-                API_BASE_URL,
-                params={'domain': domain},
-                headers=HEADERS,
-                timeout=REQUEST_TIMEOUT
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
+    try:
+        # Serve from cache first so cached domains don't spend rate-limit budget
+        response = _session.get(
+            API_BASE_URL,
+            params={'domain': domain},
+            timeout=REQUEST_TIMEOUT,
+            only_if_cached=True
+        )
+        
+        # 504 means not cached (real 504s are never cached)
+        if response.status_code == 504:
+            for attempt in range(MAX_RETRIES + 1):
+                _rate_limiter.acquire()
+                if _rate_limiter.stopped:
+                    return {
+                        'domain': domain,
+                        'api_success': False,
+                        'api_error': 'Cancelled before request',
+                        'fetched_at': datetime.now().isoformat()
+                    }
                 
-                # Extract all available metrics matching actual API response structure
-                metrics = {
-                    'domain': domain,
-                    'publisher_id': data.get('publisher_id'),
-                    'name': data.get('name'),
-                    'visit_enabled': data.get('visit_enabled'),
-                    'status': data.get('status'),
-                    'primary_supply_type': data.get('primary_supply_type'),
-                    'pub_description': data.get('pub_description'),
-                    'categories': data.get('categories'),  # IAB categories list
-                    'slug': data.get('slug'),
-                    
-                    # Core quality metrics
-                    'avg_ads_to_content_ratio': data.get('avg_ads_to_content_ratio'),
-                    'avg_ads_in_view': data.get('avg_ads_in_view'),
-                    'avg_ad_refresh': data.get('avg_ad_refresh'),
-                    'avg_page_weight': data.get('avg_page_weight'),
-                    'avg_cpu': data.get('avg_cpu'),
-                    
-                    # Supply chain metrics  
-                    'total_supply_paths': data.get('total_supply_paths'),
-                    'reseller_count': data.get('reseller_count'),
-                    'total_unique_gpids': data.get('total_unique_gpids'),
-                    'id_absorption_rate': data.get('id_absorption_rate'),
-                    'owner_domain': data.get('owner_domain'),
-                    
-                    # Metadata
-                    'updated_at': data.get('updated_at'),
-                    'api_success': True,
-                    'api_error': None,
-                    'fetched_at': datetime.now().isoformat()
-                }
+                response = _session.get(
+                    API_BASE_URL,
+                    params={'domain': domain},
+                    timeout=REQUEST_TIMEOUT
+                )
                 
-                return metrics
-            
-            elif response.status_code == 404:
-                return {
-                    'domain': domain,
-                    'api_success': False,
-                    'api_error': 'Domain not found (404)',
-                    'fetched_at': datetime.now().isoformat()
-                }
-            
-            elif response.status_code == 429:
-                # Rate limited - check for Retry-After header
-                retry_after = response.headers.get('Retry-After', '60')
-                wait_time = int(retry_after)
-                print(f"⏳ Rate limited. Waiting {wait_time}s...")
-                time.sleep(wait_time)
-                continue
-            
-            else:
-                return {
-                    'domain': domain,
-                    'api_success': False,
-                    'api_error': f'HTTP {response.status_code}: {response.text[:200]}',
-                    'fetched_at': datetime.now().isoformat()
-                }
+                if response.status_code not in RETRY_STATUS_CODES or attempt == MAX_RETRIES:
+                    break
                 
-        except requests.exceptions.RequestException as e:
-            if attempt == max_retries - 1:
-                return {
-                    'domain': domain,
-                    'api_success': False,
-                    'api_error': f'Request exception: {str(e)}',
-                    'fetched_at': datetime.now().isoformat()
-                }
-            time.sleep(2 ** attempt)  # Exponential backoff
-    
-    return {
-        'domain': domain,
-        'api_success': False,
-        'api_error': 'Max retries exceeded',
-        'fetched_at': datetime.now().isoformat()
-    }
+                if response.status_code == 429:
+                    # Rate limited - pause all workers per the Retry-After header
+                    retry_after = response.headers.get('Retry-After', '60')
+                    wait_time = int(retry_after) if retry_after.isdigit() else 60
+                    print(f"⏳ Rate limited. Waiting {wait_time}s...")
+                    _rate_limiter.pause(wait_time)
+                else:
+                    _rate_limiter.sleep(2 ** attempt)  # Exponential backoff
+    except requests.exceptions.RequestException as e:
+        return {
+            'domain': domain,
+            'api_success': False,
+            'api_error': f'Request exception: {str(e)}',
+            'fetched_at': datetime.now().isoformat()
+        }
+    
+    if response.status_code == 200:
+        try:
+            data = orjson.loads(response.content)
+        except orjson.JSONDecodeError as e:
+            # Don't keep a broken body in the cache for the next run
+            _session.cache.delete(requests=[response.request])
+            return {
+                'domain': domain,
+                'api_success': False,
+                'api_error': f'Invalid JSON response: {str(e)}',
+                'fetched_at': datetime.now().isoformat()
+            }
+
+        # Extract all available metrics matching actual API response structure
+        metrics = {
+            'domain': domain,
+            **{
+                field: _METRIC_COERCERS[field](data.get(field)) if field in _METRIC_COERCERS else data.get(field)
+                for field in METRIC_FIELDS
+            },
+            'api_success': True,
+            'api_error': None,
+            'fetched_at': datetime.now().isoformat()
+        }
+        
+        return metrics
+    
+    elif response.status_code == 404:
+        return {
+            'domain': domain,
+            'api_success': False,
+            'api_error': 'Domain not found (404)',
+            'fetched_at': datetime.now().isoformat()
+        }
+    
+    else:
+        return {
+            'domain': domain,
+            'api_success': False,
+            'api_error': f'HTTP {response.status_code}: {response.text[:200]}',
+            'fetched_at': datetime.now().isoformat()
+        }
 
 def create_test_sample(sample_df, test_size_per_network=10):
     """
@@ -229,15 +409,34 @@ def create_test_sample(sample_df, test_size_per_network=10):
     
     return test_df
 
-def save_incremental_progress(results, batch_num):
-    """Save progress incrementally to avoid losing data"""
-    os.makedirs('pickles', exist_ok=True)
-    filename = f'pickles/sincera_data_batch_{batch_num:04d}.pkl'
+def results_to_arrow(results):
+    """
+    Convert fetch_domain_metrics results to an Arrow table with RESULT_SCHEMA
+    
+    Values are already coerced to their column types by fetch_domain_metrics.
+    
+    Args:
+        results: List of result dicts (missing keys become nulls)
+    
+    Returns:
+        pa.Table: Results with fixed column order/types (categories as JSON text)
+    """
+    rows = [
+        {**result, 'categories': json.dumps(result['categories'])}
+        if isinstance(result.get('categories'), (list, dict)) else result
+        for result in results
+    ]
+    return pa.Table.from_pylist(rows, schema=RESULT_SCHEMA)
+
+def save_incremental_progress(writer, results, batch_num):
+    """
+    Save progress incrementally to avoid losing data
     
-    # Convert to DataFrame and save
-    df = pd.DataFrame(results)
-    df.to_pickle(filename)
-    return filename
+    Appends the batch to the run's Arrow IPC stream; read everything back
+    with pa.ipc.open_stream(PROGRESS_STREAM_PATH).read_all().
+    """
+    writer.write_table(results_to_arrow(results))
+    return f'{PROGRESS_STREAM_PATH} (batch {batch_num:04d})'
 
 def get_dynamic_table_name():
     """Generate dynamic table name based on current month/year"""
@@ -249,6 +448,9 @@ def upload_to_snowflake(results_df, session, table_name):
     """
     Upload results to Snowflake using overwrite mode (auto-creates table schema)
     
+    Uses write_pandas, which stages the data as Parquet files and loads them
+    with COPY INTO instead of serializing rows through the Snowpark client.
+    
     Args:
         results_df: DataFrame with results
         session: Snowpark session  
@@ -264,14 +466,19 @@ def upload_to_snowflake(results_df, session, table_name):
     
     print(f"📋 Column names converted to uppercase for Snowflake")
     
-    # Drop table if exists to ensure clean schema creation
-    drop_sql = f"DROP TABLE IF EXISTS ANALYTICS.DI_AGGREGATIONS.{table_name}"
-    session.sql(drop_sql).collect()
-    print(f"📋 Dropped existing table if it existed")
-    
-    # Create Snowpark DataFrame and overwrite table (auto-creates schema)
-    snowpark_df = session.create_dataframe(upload_df)
-    snowpark_df.write.mode("overwrite").save_as_table(f"ANALYTICS.DI_AGGREGATIONS.{table_name}")
+    # Stage as Parquet and COPY INTO; overwrite replaces any existing table.
+    # Table name is uppercased since write_pandas quotes identifiers.
+    session.write_pandas(
+        upload_df,
+        table_name.upper(),
+        database='ANALYTICS',
+        schema='DI_AGGREGATIONS',
+        auto_create_table=True,
+        overwrite=True,
+        use_logical_type=True,
+        chunk_size=100_000,
+        compression='snappy'
+    )
     
     print(f"✅ Upload complete: {len(results_df):,} records")
     
@@ -306,48 +513,70 @@ def collect_all_data(sample_df, batch_size=100, is_testing=False):
     failed_requests = 0
     start_time = datetime.now()
     
-    for i, (_, row) in enumerate(sample_df.iterrows(), 1):
-        domain = row['domain']
-        network = row['network']
-        
-        print(f"\n[{i:,}/{len(sample_df):,}] Fetching: {domain} ({network})")
-        
-        result = fetch_domain_metrics(domain)
-        result['network'] = network  # Add network info
-        all_results.append(result)
+    # Incremental saves append to one Arrow IPC stream opened for the whole run
+    os.makedirs('pickles', exist_ok=True)
+    progress_sink = pa.OSFile(PROGRESS_STREAM_PATH, 'wb')
+    progress_writer = pa.ipc.new_stream(progress_sink, RESULT_SCHEMA)
+    
+    # Fetch concurrently; the shared rate limiter keeps us within API caps
+    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    try:
+        futures = {
+            executor.submit(fetch_domain_metrics, domain): network
+            for domain, network in zip(sample_df['domain'].to_numpy(), sample_df['network'].to_numpy())
+        }
         
-        if result['api_success']:
-            successful_requests += 1
-            a2cr = result.get('avg_ads_to_content_ratio', 'N/A')
-            print(f"  ✅ Success - A2CR: {a2cr}")
-        else:
-            failed_requests += 1
-            print(f"  ❌ Failed - {result['api_error']}")
+        for i, future in enumerate(as_completed(futures), 1):
+            network = futures[future]
+            result = future.result()
+            result['network'] = network  # Add network info
+            all_results.append(result)
+            
+            print(f"\n[{i:,}/{len(sample_df):,}] Fetched: {result['domain']} ({network})")
+            
+            if result['api_success']:
+                successful_requests += 1
+                a2cr = result.get('avg_ads_to_content_ratio', 'N/A')
+                print(f"  ✅ Success - A2CR: {a2cr}")
+            else:
+                failed_requests += 1
+                print(f"  ❌ Failed - {result['api_error']}")
+            
+            # Save progress every batch_size domains
+            if i % batch_size == 0:
+                batch_num = i // batch_size
+                filename = save_incremental_progress(progress_writer, all_results[-batch_size:], batch_num)
+                print(f"  💾 Progress saved: {filename}")
+            
+            # Progress update
+            if i % 50 == 0:
+                elapsed = datetime.now() - start_time
+                rate = i / elapsed.total_seconds() * 60  # requests per minute
+                remaining = len(sample_df) - i
+                eta_minutes = remaining / rate if rate > 0 else 0
+            
+                print(f"\n📈 PROGRESS UPDATE:")
+                print(f"   Completed: {i:,}/{len(sample_df):,} ({i/len(sample_df)*100:.1f}%)")
+                print(f"   Success rate: {successful_requests}/{i} ({successful_requests/i*100:.1f}%)")
+                print(f"   Current rate: {rate:.1f} req/min")
+                print(f"   ETA: {eta_minutes:.1f} minutes")
         
-        # Save progress every batch_size domains
-        if i % batch_size == 0:
-            batch_num = i // batch_size
-            filename = save_incremental_progress(all_results[-batch_size:], batch_num)
-            print(f"  💾 Progress saved: {filename}")
+        # Save any remaining results
+        if len(all_results) % batch_size != 0:
+            remaining_start = -(len(all_results) % batch_size)
+            batch_num = len(all_results) // batch_size + 1
+            save_incremental_progress(progress_writer, all_results[remaining_start:], batch_num)
         
-        # Progress update
-        if i % 50 == 0:
-            elapsed = datetime.now() - start_time
-            rate = i / elapsed.total_seconds() * 60  # requests per minute
-            remaining = len(sample_df) - i
-            eta_minutes = remaining / rate if rate > 0 else 0
-            
-            print(f"\n📈 PROGRESS UPDATE:")
-            print(f"   Completed: {i:,}/{len(sample_df):,} ({i/len(sample_df)*100:.1f}%)")
-            print(f"   Success rate: {successful_requests}/{i} ({successful_requests/i*100:.1f}%)")
-            print(f"   Current rate: {rate:.1f} req/min")
-            print(f"   ETA: {eta_minutes:.1f} minutes")
-    
-    # Save any remaining results
-    if len(all_results) % batch_size != 0:
-        remaining_start = -(len(all_results) % batch_size)
-        batch_num = len(all_results) // batch_size + 1
-        save_incremental_progress(all_results[remaining_start:], batch_num)
+        executor.shutdown()
+    except BaseException:
+        # Cancel queued fetches (e.g. on Ctrl-C) and wake workers waiting on
+        # the rate limiter so they return without calling the API
+        _rate_limiter.stop()
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        progress_writer.close()
+        progress_sink.close()
     
     # Final summary
     end_time = datetime.now()
@@ -403,9 +632,9 @@ def main(is_testing=False, upload_to_snowflake_flag=True):
         # Collect all data
         results = collect_all_data(sample_df, batch_size=100, is_testing=is_testing)
         
-        # Convert to DataFrame and save final dataset
+        # Save final dataset; the pickle and upload keep categories as lists
         print("\n💾 Saving final dataset...")
-        results_df = pd.DataFrame(results)
+        results_df = pd.DataFrame(results, columns=RESULT_SCHEMA.names)
         
         # Save as pickle
         final_pickle_path = f'pickles/sincera_metrics{filename_suffix}.pkl'
@@ -414,7 +643,7 @@ def main(is_testing=False, upload_to_snowflake_flag=True):
         
         # Also save as CSV for easier viewing
         csv_path = f'pickles/sincera_metrics{filename_suffix}.csv'
-        results_df.to_csv(csv_path, index=False)
+        pacsv.write_csv(results_to_arrow(results), csv_path)
         print(f"✅ CSV version saved: {csv_path}")
         
         # Upload to Snowflake if requested
@@ -423,7 +652,6 @@ def main(is_testing=False, upload_to_snowflake_flag=True):
             
             # Create Snowpark session
             session = func_create_snowpark_session(USER_NAME="smaity")
-            session.sql("use schema DI_AGGREGATIONS").collect()
             
             # Get dynamic table name
             table_name = get_dynamic_table_name()
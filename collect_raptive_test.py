@@ -35,6 +35,7 @@ load_dotenv()
 # Add current directory to Python path for imports
 sys.path.append(os.getcwd())
 from snowpark_connect import func_create_snowpark_session
+from domain_utils import DOMAIN_HOST_RE
 
 # Sincera API Configuration
 SINCERA_API_KEY = os.environ.get('SINCERA_API_KEY')
@@ -70,28 +71,18 @@ def load_raptive_test_domains(txt_file='raptive_test_domains.txt'):
     
     print(f"📋 Loading domains from {txt_file}...")
     
-    # Read text file line by line
+    # Read text file line by line, normalizing each domain as it is read
     domains = []
     with open(txt_file, 'r', encoding='utf-8') as f:
         for line in f:
-            domain = line.strip()
+            domain = DOMAIN_HOST_RE.match(line.strip().lower()).group('host')
             if domain:  # Skip empty lines
                 domains.append(domain)
     
     print(f"Raw domains loaded: {len(domains)}")
     
-    # Create DataFrame
-    df = pd.DataFrame({'domain': domains})
-    
-    # Clean and normalize domains
-    df['domain'] = df['domain'].str.lower().str.strip()
-    df = df.dropna(subset=['domain'])
-    df = df[df['domain'] != '']
-    
-    # Remove any protocol prefixes and paths
-    df['domain'] = df['domain'].str.replace(r'^https?://', '', regex=True)
-    df['domain'] = df['domain'].str.replace(r'^www\.', '', regex=True)
-    df['domain'] = df['domain'].str.split('/').str[0]
+    # Create DataFrame with Arrow-backed strings
+    df = pd.DataFrame({'domain': domains}, dtype='string[pyarrow]')
     
     # Remove duplicates
     df = df.drop_duplicates(subset=['domain']).reset_index(drop=True)
@@ -338,14 +329,19 @@ def upload_to_snowflake(results_df, session, table_name):
     print(f"📋 Column order and types standardized to match main table")
     print(f"📋 Final column order: {', '.join(upload_df.columns.tolist())}")
     
-    # Drop table if exists to ensure clean schema creation
-    drop_sql = f"DROP TABLE IF EXISTS ANALYTICS.DI_AGGREGATIONS.{table_name}"
-    session.sql(drop_sql).collect()
-    print(f"📋 Dropped existing table if it existed")
-    
-    # Create Snowpark DataFrame and create table (auto-creates schema)
-    snowpark_df = session.create_dataframe(upload_df)
-    snowpark_df.write.mode("overwrite").save_as_table(f"ANALYTICS.DI_AGGREGATIONS.{table_name}")
+    # Stage as Parquet and COPY INTO; overwrite replaces any existing table.
+    # Table name is uppercased since write_pandas quotes identifiers.
+    session.write_pandas(
+        upload_df,
+        table_name.upper(),
+        database='ANALYTICS',
+        schema='DI_AGGREGATIONS',
+        auto_create_table=True,
+        overwrite=True,
+        use_logical_type=True,
+        chunk_size=100_000,
+        compression='snappy'
+    )
     
     print(f"✅ Upload complete: {len(results_df):,} records")
     
@@ -380,10 +376,8 @@ def collect_raptive_test_data(domains_df, batch_size=50, is_testing=False):
     failed_requests = 0
     start_time = datetime.now()
     
-    for i, (_, row) in enumerate(domains_df.iterrows(), 1):
-        domain = row['domain']
-        network = row['network']
-        
+    domain_network_pairs = zip(domains_df['domain'].to_numpy(), domains_df['network'].to_numpy())
+    for i, (domain, network) in enumerate(domain_network_pairs, 1):
         print(f"\n[{i:,}/{len(domains_df):,}] Fetching: {domain} ({network})")
         
         result = fetch_domain_metrics(domain)
@@ -493,7 +487,6 @@ def main(is_testing=False, upload_to_snowflake_flag=True):
             
             # Create Snowpark session
             session = func_create_snowpark_session(USER_NAME="smaity")
-            session.sql("use schema DI_AGGREGATIONS").collect()
             
             # Get table name
             table_name = get_raptive_test_table_name()
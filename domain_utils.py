@@ -0,0 +1,5 @@
+import re
+
+# Captures the bare host from a URL/domain (protocol, www. and path dropped)
+DOMAIN_HOST_PATTERN = r'^(?:https?://)?(?:www\.)?(?P<host>[^/]*)'
+DOMAIN_HOST_RE = re.compile(DOMAIN_HOST_PATTERN)
@@ -1,5 +1,39 @@
 from snowflake.snowpark import Session
 import boto3
+import threading
+import atexit
+
+SNOWFLAKE_DATABASE = "ANALYTICS"
+SNOWFLAKE_SCHEMA = "DI_AGGREGATIONS"
+AUDIT_JOIN_TIMEOUT = 10  # seconds to wait for the audit write at exit
+
+def _write_audit(session, USER_NAME):
+    """
+    Function to record the session in the DI_SESSION_AUDIT table
+    """
+    try:
+        my_selections = session.sql("select current_role(), current_warehouse(), current_database(), current_schema(), CONVERT_TIMEZONE('UTC', 'America/New_York', current_timestamp)").collect()
+        my_lambda = lambda my_selections: "Not Specified" if my_selections[0][3] is None else my_selections[0][3]
+        # print("User: " + USER_NAME)
+        # print("Role: " + my_selections[0][0])
+        # print("Warehouse: " + my_selections[0][1])
+        # print("Database: " + my_selections[0][2])
+        # print("Schema: " + my_lambda(my_selections))
+        # print("Current DateTime: " + str(my_selections[0][4]))
+        df_list = [[session._session_id, USER_NAME, my_selections[0][0], my_selections[0][1], my_selections[0][2], my_lambda(my_selections), my_selections[0][4]]]
+        df_session = session.create_dataframe(df_list, schema=["SESSION_ID", "USER_NAME", "ROLE", "WAREHOUSE", "DATABASE", "SCHEMA", "LOGIN_DATETIME"])
+        df_session.write.mode("append").save_as_table("ANALYTICS.DI_AGGREGATIONS.DI_SESSION_AUDIT")
+    except Exception as e:
+        # Runs on a background thread, so report failures instead of losing them
+        print(f"⚠️ Session audit failed: {e}")
+
+def _join_audit(audit_thread):
+    """
+    Function to wait (briefly) for the background audit write at exit
+    """
+    audit_thread.join(AUDIT_JOIN_TIMEOUT)
+    if audit_thread.is_alive():
+        print(f"⚠️ Session audit still running after {AUDIT_JOIN_TIMEOUT}s; audit row may be lost")
 
 def func_create_snowpark_session(USER_NAME):
     """
@@ -9,21 +43,13 @@ def func_create_snowpark_session(USER_NAME):
     SNOWFLAKE_USER = ssm.get_parameter(Name="prod.snowflake.di.snowpark.user", WithDecryption=True)['Parameter']['Value']
     SNOWFLAKE_PASSWORD = ssm.get_parameter(Name="prod.snowflake.di.snowpark.user.password", WithDecryption=True)['Parameter']['Value']
     SNOWFLAKE_ACCOUNT = ssm.get_parameter(Name='prod.snowflake.account', WithDecryption=True)['Parameter']['Value']
-    connection_parameters = {"account": SNOWFLAKE_ACCOUNT, "user": SNOWFLAKE_USER, "password": SNOWFLAKE_PASSWORD}
+    # Database/schema set at login so no separate "use schema" round trip is needed
+    connection_parameters = {"account": SNOWFLAKE_ACCOUNT, "user": SNOWFLAKE_USER, "password": SNOWFLAKE_PASSWORD, "database": SNOWFLAKE_DATABASE, "schema": SNOWFLAKE_SCHEMA}
     session = Session.builder.configs(connection_parameters).create()
 
-    SNOWFLAKE_SCHEMA = "DI_AGGREGATIONS"
-    session.sql("use schema {}".format(SNOWFLAKE_SCHEMA)).collect()
-    
-    my_selections = session.sql("select current_role(), current_warehouse(), current_database(), current_schema(), CONVERT_TIMEZONE('UTC', 'America/New_York', current_timestamp)").collect()
-    my_lambda = lambda my_selections: "Not Specified" if my_selections[0][3] is None else my_selections[0][3]
-    # print("User: " + USER_NAME)
-    # print("Role: " + my_selections[0][0])
-    # print("Warehouse: " + my_selections[0][1])
-    # print("Database: " + my_selections[0][2])
-    # print("Schema: " + my_lambda(my_selections))
-    # print("Current DateTime: " + str(my_selections[0][4]))
-    df_list = [[session._session_id, USER_NAME, my_selections[0][0], my_selections[0][1], my_selections[0][2], my_lambda(my_selections), my_selections[0][4]]]
-    df_session = session.create_dataframe(df_list, schema=["SESSION_ID", "USER_NAME", "ROLE", "WAREHOUSE", "DATABASE", "SCHEMA", "LOGIN_DATETIME"])
-    df_session.write.mode("append").save_as_table("ANALYTICS.DI_AGGREGATIONS.DI_SESSION_AUDIT")
+    # Write the audit row in the background so callers can start work immediately,
+    # but give it a chance to finish before exit (short upload-only runs)
+    audit_thread = threading.Thread(target=_write_audit, args=(session, USER_NAME), daemon=True)
+    audit_thread.start()
+    atexit.register(_join_audit, audit_thread)
     return session
\ No newline at end of file